@@ -6,35 +6,127 @@ Provides visualisation helpers and analytics utilities.
 """
 
 import json
+import logging
 import os
-import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import joblib
 import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+try:
+    import onnxruntime as ort
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    HAS_ONNX = True
+except ImportError:
+    HAS_ONNX = False
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 #  Paths
 # ---------------------------------------------------------------------------
 _DIR          = os.path.dirname(os.path.abspath(__file__))
 _MODEL_PATH   = os.path.join(_DIR, "model.joblib")
+_ONNX_PATH    = os.path.join(_DIR, "model.onnx")
 _METRICS_PATH = os.path.join(_DIR, "model_metrics.json")
 
+N_FEATURES = 6   # [ndvi, ndre, msi, zscore_ndvi, nir, swir]
+
+# Rows per predict_proba call on the native RandomForest path.  Chunks run
+# concurrently (tree traversal releases the GIL) with the forest pinned to
+# n_jobs=1, so per-tree probability buffers stay chunk-sized instead of
+# image-sized.  Other models (XGBoost) keep their own native threading.
+PREDICT_CHUNK = 8192
+_EXECUTOR     = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+_RNG = np.random.default_rng()
+
+# COLORMAP_JET as a (256, 3) BGR lookup table, built once at import
+_JET_LUT = cv2.applyColorMap(
+    np.arange(256, dtype=np.uint8).reshape(256, 1), cv2.COLORMAP_JET
+).reshape(256, 3)
+
 # ---------------------------------------------------------------------------
 #  Global model cache  (loaded once per process)
 # ---------------------------------------------------------------------------
-_MODEL = None
+_MODEL   = None
+_SESSION = None
+
+
+def _build_onnx_session(model):
+    """
+    Export the classifier to ONNX (cached beside model.joblib) and open an
+    onnxruntime session on it.
+
+    Only sklearn RandomForests are exported: skl2onnx has no converter for
+    the default XGBClassifier, and XGBoost's own multi-threaded predictor
+    already serves it natively.  Returns None for other model types, when the
+    ONNX toolchain is unavailable, or when the export / session load fails;
+    callers then fall back to predict_proba.
+    """
+    if not HAS_ONNX:
+        return None
+    if not isinstance(model, RandomForestClassifier):
+        logger.info("No ONNX export for %s; using predict_proba", type(model).__name__)
+        return None
+
+    stale = (
+        not os.path.exists(_ONNX_PATH)
+        or os.path.getmtime(_ONNX_PATH) < os.path.getmtime(_MODEL_PATH)
+    )
+    tmp_path = None
+    try:
+        if stale:
+            # A float32 input makes skl2onnx emit float32 tree thresholds and
+            # leaf values, half the bytes of the forest's float64 node arrays.
+            # (RandomForest only; XGBoost models never reach this export.)
+            onx = convert_sklearn(
+                model,
+                initial_types=[("input", FloatTensorType([None, N_FEATURES]))],
+                options={id(model): {"zipmap": False}},
+            )
+            # Write-then-rename so concurrently starting workers never open
+            # a half-written file.
+            with tempfile.NamedTemporaryFile(
+                dir=_DIR, suffix=".onnx.tmp", delete=False
+            ) as tmp:
+                tmp_path = tmp.name
+                tmp.write(onx.SerializeToString())
+            os.replace(tmp_path, _ONNX_PATH)
+            tmp_path = None
+
+        sess_options = ort.SessionOptions()
+        sess_options.intra_op_num_threads = os.cpu_count() or 1
+        return ort.InferenceSession(
+            _ONNX_PATH, sess_options, providers=["CPUExecutionProvider"]
+        )
+    except Exception as exc:   # read-only FS, ORT load error, ...
+        first_line = str(exc).splitlines()[0] if str(exc) else ""
+        logger.warning(
+            "ONNX inference unavailable (%s: %s); using predict_proba",
+            type(exc).__name__, first_line,
+        )
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return None
 
 
 def _load_model():
-    global _MODEL
+    global _MODEL, _SESSION
     if _MODEL is None:
         if not os.path.exists(_MODEL_PATH):
             raise FileNotFoundError(
                 f"Trained model not found at {_MODEL_PATH}. "
                 "Run  python train_model.py  first."
             )
-        _MODEL = joblib.load(_MODEL_PATH)
+        _MODEL   = joblib.load(_MODEL_PATH)
+        if isinstance(_MODEL, RandomForestClassifier):
+            _MODEL.set_params(n_jobs=1)
+        _SESSION = _build_onnx_session(_MODEL)
     return _MODEL
 
 
@@ -42,6 +134,14 @@ def _load_model():
 #  Core inference
 # ---------------------------------------------------------------------------
 
+def _stress_probability(proba: np.ndarray) -> np.ndarray:
+    """Collapse an (N, n_classes) probability matrix to P(stressed)."""
+    if proba.shape[1] == 2:
+        return proba[:, 1]
+    # multi-class: class 0 = healthy, rest = stress types
+    return proba[:, 1:].sum(axis=1)
+
+
 def predict_stress(features: np.ndarray, shape: tuple) -> np.ndarray:
     """
     Predict per-pixel stress probability.
@@ -59,15 +159,26 @@ def predict_stress(features: np.ndarray, shape: tuple) -> np.ndarray:
         Values in [0, 1] representing per-pixel stress probability.
     """
     model = _load_model()
-    proba = model.predict_proba(features)
-
-    if proba.shape[1] == 2:
-        stress_prob = proba[:, 1]
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    n = features.shape[0]
+    stress_prob = np.empty(n, dtype=np.float32)
+
+    if _SESSION is not None:
+        # outputs: [label, probabilities]  (zipmap disabled at export)
+        proba = _SESSION.run(None, {"input": features})[1]
+        stress_prob[:] = _stress_probability(proba)
+    elif isinstance(model, RandomForestClassifier):
+        def _predict_chunk(start: int) -> None:
+            stop = start + PREDICT_CHUNK
+            proba = model.predict_proba(features[start:stop])
+            stress_prob[start:stop] = _stress_probability(proba)
+
+        # list() drains the iterator so worker exceptions propagate here
+        list(_EXECUTOR.map(_predict_chunk, range(0, n, PREDICT_CHUNK)))
     else:
-        # multi-class: class 0 = healthy, rest = stress types
-        stress_prob = proba[:, 1:].sum(axis=1)
+        stress_prob[:] = _stress_probability(model.predict_proba(features))
 
-    stress_prob = np.clip(stress_prob, 0.0, 1.0).astype(np.float32)
+    np.clip(stress_prob, 0.0, 1.0, out=stress_prob)
     return stress_prob.reshape(shape)
 
 
@@ -87,7 +198,7 @@ def generate_heatmap(stress_map: np.ndarray) -> np.ndarray:
     heatmap : np.ndarray (H, W, 3) uint8
     """
     uint8 = (np.clip(stress_map, 0.0, 1.0) * 255).astype(np.uint8)
-    return cv2.applyColorMap(uint8, cv2.COLORMAP_JET)
+    return _JET_LUT[uint8]
 
 
 def create_overlay(
@@ -148,6 +259,9 @@ def compute_alert_level(stress_pct: float) -> str:
     return "CRITICAL"
 
 
+_DISTRIBUTION_EDGES = np.array([0.3, 0.6], dtype=np.float32)
+
+
 def compute_distribution(stress_map: np.ndarray) -> dict:
     """
     Return percentage breakdown of pixel health categories.
@@ -156,14 +270,17 @@ def compute_distribution(stress_map: np.ndarray) -> dict:
     moderate : 0.3 <= stress < 0.6
     critical : stress >= 0.6
     """
-    flat  = stress_map.flatten()
-    total = len(flat)
+    total = stress_map.size
     if total == 0:
         return {"healthy": 0.0, "moderate": 0.0, "critical": 0.0}
 
-    healthy  = float(np.sum(flat < 0.3)                    / total * 100)
-    moderate = float(np.sum((flat >= 0.3) & (flat < 0.6))  / total * 100)
-    critical = float(np.sum(flat >= 0.6)                    / total * 100)
+    # Single pass: bucket index 0 / 1 / 2 per pixel, then count
+    buckets = np.digitize(stress_map.ravel(), _DISTRIBUTION_EDGES)
+    counts  = np.bincount(buckets, minlength=3)
+
+    healthy  = float(counts[0] / total * 100)
+    moderate = float(counts[1] / total * 100)
+    critical = float(counts[2] / total * 100)
 
     return {
         "healthy":  round(healthy,  2),
@@ -180,11 +297,12 @@ def generate_forecast(stress_pct: float) -> list:
     -------
     list of 7 dicts: [{"day": int, "stress": float, "level": str}, ...]
     """
+    deltas   = _RNG.normal(loc=0.8, scale=3.5, size=7)   # slight upward drift
     forecast = []
     current  = stress_pct
-    for day in range(1, 8):
-        delta   = random.gauss(mu=0.8, sigma=3.5)   # slight upward drift
-        current = float(np.clip(current + delta, 0.0, 100.0))
+    for day, delta in enumerate(deltas, start=1):
+        # clamp every step so a walk pinned at a bound can come back off it
+        current = min(max(current + float(delta), 0.0), 100.0)
         forecast.append({
             "day":   day,
             "stress": round(current, 1),
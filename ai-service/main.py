@@ -12,13 +12,15 @@ POST /analyze   -- accepts a 6-band .tif / .tiff upload and returns:
 """
 
 import base64
+import hashlib
 import io
+import logging
 import os
-import tempfile
+from collections import OrderedDict
 
 import cv2
 import numpy as np
-import rasterio
+from rasterio.io import MemoryFile
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -33,6 +35,20 @@ from inference import (
 )
 from spectral import build_feature_stack
 
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+try:
+    import tifffile
+    HAS_TIFFFILE = True
+except ImportError:
+    HAS_TIFFFILE = False
+
+logger = logging.getLogger(__name__)
+
 # ---------------------------------------------------------------------------
 #  App
 # ---------------------------------------------------------------------------
@@ -50,15 +66,92 @@ app.add_middleware(
 )
 
 
+BAND_NAMES = ("blue", "green", "red", "red_edge", "nir", "swir")
+
+# Responses for recently seen uploads, keyed on a hash of the raw bytes.
+# Uploads above RESPONSE_CACHE_MAX_BYTES bypass the cache.
+RESPONSE_CACHE_SIZE      = 32
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+_RESPONSE_CACHE: "OrderedDict[str, dict]" = OrderedDict()
+
+# NDVI colorisation LUT -- green channel emphasis: (0, green, 0)
+_NDVI_LUT = np.zeros((256, 3), dtype=np.uint8)
+_NDVI_LUT[:, 1] = np.arange(256, dtype=np.uint8)
+
+
 # ---------------------------------------------------------------------------
 #  Helpers
 # ---------------------------------------------------------------------------
 
-def _encode_bgr_to_base64_png(bgr: np.ndarray) -> str:
-    """Encode a BGR uint8 image to a base64 PNG data-URL string."""
-    _, buf = cv2.imencode(".png", bgr)
+JPEG_QUALITY = 85
+
+
+def _encode_bgr_to_base64_jpeg(bgr: np.ndarray) -> str:
+    """Encode a BGR uint8 image to a base64 JPEG data-URL string."""
+    _, buf = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
     b64    = base64.b64encode(buf.tobytes()).decode()
-    return f"data:image/png;base64,{b64}"
+    return f"data:image/jpeg;base64,{b64}"
+
+
+def _content_key(content: bytes) -> str:
+    """Hash raw upload bytes into a response-cache key."""
+    if HAS_XXHASH:
+        return xxhash.xxh3_64_hexdigest(content)
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _read_band_stack(content: bytes) -> np.ndarray:
+    """
+    Decode an uploaded 6-band TIFF into a (6, H, W) float32 array.
+
+    Plain TIFFs are read with tifffile, which skips GDAL's per-open dataset
+    setup (georeferencing is not used by the analysis).  Anything tifffile
+    cannot decode, or that does not come out as six bands, goes through
+    rasterio, which also reports the band-count error.
+    """
+    if HAS_TIFFFILE:
+        try:
+            with tifffile.TiffFile(io.BytesIO(content)) as tif:
+                series = tif.series[0]
+                arr    = series.asarray()
+                axes   = series.axes
+        except Exception:   # unsupported compression / layout -> use GDAL
+            arr = None
+
+        if arr is not None and arr.ndim == 3:
+            if axes.endswith("YX") and arr.shape[0] == 6:      # planar
+                return np.ascontiguousarray(arr, dtype=np.float32)
+            if axes.startswith("YX") and arr.shape[2] == 6:    # pixel-interleaved
+                return np.ascontiguousarray(np.moveaxis(arr, -1, 0), dtype=np.float32)
+
+    with MemoryFile(content) as memfile, memfile.open() as src:
+        if src.count != 6:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Expected exactly 6 bands; got {src.count}.",
+            )
+        # One decode pass into a single (6, H, W) float32 buffer
+        return src.read(out_dtype="float32")
+
+
+def _extract_bgr(bands: dict) -> np.ndarray:
+    """
+    Min-max stretch the blue / green / red bands into a BGR uint8 image.
+    Channels with no dynamic range come out black.
+    """
+    h, w = bands["red"].shape
+    bgr = np.empty((h, w, 3), dtype=np.float32)
+    bgr[..., 0] = bands["blue"]
+    bgr[..., 1] = bands["green"]
+    bgr[..., 2] = bands["red"]
+
+    # Per-channel stretch applied to the interleaved buffer in place
+    mn    = bgr.min(axis=(0, 1))
+    span  = bgr.max(axis=(0, 1)) - mn
+    scale = np.where(span < 1e-8, 0.0, 255.0 / np.maximum(span, 1e-8))
+    np.subtract(bgr, mn, out=bgr)
+    np.multiply(bgr, scale.astype(np.float32), out=bgr)
+    return bgr.astype(np.uint8)
 
 
 def _make_advisory(stress_pct: float, alert: str) -> str:
@@ -81,6 +174,26 @@ def _make_advisory(stress_pct: float, alert: str) -> str:
     )
 
 
+# ---------------------------------------------------------------------------
+#  Startup
+# ---------------------------------------------------------------------------
+
+@app.on_event("startup")
+def warm_up():
+    """
+    Load the model and push a small dummy field through the pipeline so the
+    first real /analyze request doesn't pay for deserialisation, ONNX export,
+    or numba compilation.  Failures are logged, not raised, so /health stays
+    up and /analyze retries the lazy load (and reports the error) per request.
+    """
+    dummy_bands = {name: np.full((32, 32), 0.1, dtype=np.float32) for name in BAND_NAMES}
+    try:
+        features, shape, _ = build_feature_stack(dummy_bands)
+        predict_stress(features, shape)
+    except Exception:
+        logger.exception("Warm-up failed; model will be loaded on first /analyze")
+
+
 # ---------------------------------------------------------------------------
 #  Endpoint
 # ---------------------------------------------------------------------------
@@ -101,38 +214,21 @@ async def analyze(file: UploadFile = File(...)):
             detail=f"Unsupported file type '{ext}'. Only .tif / .tiff are accepted.",
         )
 
-    # ── Save to a temp file (rasterio needs a real path or file-like obj) ────
-    try:
-        content = await file.read()
-        with tempfile.NamedTemporaryFile(suffix=".tif", delete=False) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-
-        # ── Open with rasterio and extract bands ─────────────────────────────
-        with rasterio.open(tmp_path) as src:
-            if src.count != 6:
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"Expected exactly 6 bands; got {src.count}.",
-                )
-            b_blue     = src.read(1).astype(np.float32)
-            b_green    = src.read(2).astype(np.float32)
-            b_red      = src.read(3).astype(np.float32)
-            b_red_edge = src.read(4).astype(np.float32)
-            b_nir      = src.read(5).astype(np.float32)
-            b_swir     = src.read(6).astype(np.float32)
-
-    finally:
-        os.unlink(tmp_path)
-
-    band_dict = {
-        "blue":     b_blue,
-        "green":    b_green,
-        "red":      b_red,
-        "red_edge": b_red_edge,
-        "nir":      b_nir,
-        "swir":     b_swir,
-    }
+    content = await file.read()
+
+    # ── Serve repeated uploads from the response cache ───────────────────────
+    cache_key = None
+    if len(content) <= RESPONSE_CACHE_MAX_BYTES:
+        cache_key = _content_key(content)
+        if cache_key in _RESPONSE_CACHE:
+            _RESPONSE_CACHE.move_to_end(cache_key)
+            return _RESPONSE_CACHE[cache_key]
+
+    # ── Decode bands ─────────────────────────────────────────────────────────
+    band_stack = _read_band_stack(content)
+
+    # Each value is an (H, W) view into band_stack
+    band_dict = dict(zip(BAND_NAMES, band_stack))
 
     # ── Build feature stack ──────────────────────────────────────────────────
     features, shape, index_maps = build_feature_stack(band_dict)
@@ -152,38 +248,24 @@ async def analyze(file: UploadFile = File(...)):
     H, W = shape
 
     # 1) Pseudo-RGB  (scale reflectance to uint8)
-    def _to_uint8(arr):
-        mn, mx = arr.min(), arr.max()
-        if mx - mn < 1e-8:
-            return np.zeros_like(arr, dtype=np.uint8)
-        return ((arr - mn) / (mx - mn) * 255).astype(np.uint8)
-
-    r_u8 = _to_uint8(b_red)
-    g_u8 = _to_uint8(b_green)
-    b_u8 = _to_uint8(b_blue)
-    rgb_bgr = cv2.merge([b_u8, g_u8, r_u8])   # OpenCV expects BGR
+    rgb_bgr = _extract_bgr(band_dict)   # OpenCV expects BGR
 
     # 2) NDVI green-colorisation
     ndvi_raw  = index_maps["ndvi"]
     ndvi_norm = np.clip((ndvi_raw + 1.0) / 2.0, 0, 1)
     ndvi_u8   = (ndvi_norm * 255).astype(np.uint8)
-    # Green channel emphasis: (0, green, 0)
-    ndvi_bgr  = cv2.merge([
-        np.zeros_like(ndvi_u8),
-        ndvi_u8,
-        np.zeros_like(ndvi_u8),
-    ])
+    ndvi_bgr  = _NDVI_LUT[ndvi_u8]
 
     # 3) Heatmap overlay
     heatmap = generate_heatmap(stress_map)
     overlay = create_overlay(rgb_bgr, heatmap, alpha=0.55)
 
-    # ── Encode to base64 PNG ─────────────────────────────────────────────────
-    rgb_b64     = _encode_bgr_to_base64_png(rgb_bgr)
-    ndvi_b64    = _encode_bgr_to_base64_png(ndvi_bgr)
-    overlay_b64 = _encode_bgr_to_base64_png(overlay)
+    # ── Encode to base64 JPEG ────────────────────────────────────────────────
+    rgb_b64     = _encode_bgr_to_base64_jpeg(rgb_bgr)
+    ndvi_b64    = _encode_bgr_to_base64_jpeg(ndvi_bgr)
+    overlay_b64 = _encode_bgr_to_base64_jpeg(overlay)
 
-    return {
+    response = {
         # Images
         "rgb_image":     rgb_b64,
         "ndvi_image":    ndvi_b64,
@@ -204,6 +286,13 @@ async def analyze(file: UploadFile = File(...)):
         },
     }
 
+    if cache_key is not None:
+        _RESPONSE_CACHE[cache_key] = response
+        if len(_RESPONSE_CACHE) > RESPONSE_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+
+    return response
+
 
 @app.get("/health")
 def health():
@@ -14,16 +14,30 @@ Assumed 6-band layout (Sentinel-2 style):
 
 import numpy as np
 
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 
 # ---------------------------------------------------------------------------
 #  Helper
 # ---------------------------------------------------------------------------
 
-def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
-    """Element-wise division; returns 0 wherever the denominator is zero."""
-    with np.errstate(divide="ignore", invalid="ignore"):
-        result = np.where(np.abs(denominator) > 1e-10, numerator / denominator, 0.0)
-    return result.astype(np.float32)
+def _safe_divide(
+    numerator: np.ndarray,
+    denominator: np.ndarray,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Element-wise float32 division; returns 0 wherever the denominator is zero.
+    `out` may be the numerator's own scratch buffer to divide in place.
+    """
+    valid = np.abs(denominator) > 1e-10
+    out = np.divide(numerator, denominator, out=out, where=valid, dtype=np.float32)
+    out[~valid] = 0.0
+    return out
 
 
 # ---------------------------------------------------------------------------
@@ -32,12 +46,16 @@ def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
 
 def compute_ndvi(nir: np.ndarray, red: np.ndarray) -> np.ndarray:
     """Normalized Difference Vegetation Index  (NIR - Red) / (NIR + Red)."""
-    return _safe_divide(nir - red, nir + red)
+    num = np.subtract(nir, red, dtype=np.float32)
+    den = np.add(nir, red, dtype=np.float32)
+    return _safe_divide(num, den, out=num)
 
 
 def compute_ndre(nir: np.ndarray, red_edge: np.ndarray) -> np.ndarray:
     """Normalized Difference Red-Edge Index  (NIR - RedEdge) / (NIR + RedEdge)."""
-    return _safe_divide(nir - red_edge, nir + red_edge)
+    num = np.subtract(nir, red_edge, dtype=np.float32)
+    den = np.add(nir, red_edge, dtype=np.float32)
+    return _safe_divide(num, den, out=num)
 
 
 def compute_msi(swir: np.ndarray, nir: np.ndarray) -> np.ndarray:
@@ -58,6 +76,59 @@ def compute_zscore_anomaly(index_map: np.ndarray) -> np.ndarray:
     return np.abs((index_map - mu) / sigma).astype(np.float32)
 
 
+# ---------------------------------------------------------------------------
+#  Fused kernel  (numba)
+# ---------------------------------------------------------------------------
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _compute_features(nir, red, red_edge, swir, out):
+        """
+        Fill `out` (H*W, 6) with [ndvi, ndre, msi, zscore_ndvi, nir, swir]
+        in two sweeps: one over the bands (indices + NDVI sum / sum-of-squares),
+        one over the NDVI column for the z-score.  Same zero-denominator and
+        zero-sigma rules as the NumPy functions above.
+        """
+        h, w = nir.shape
+        n = h * w
+        if n == 0:
+            return
+
+        total    = 0.0
+        total_sq = 0.0
+        for i in prange(h):
+            for j in range(w):
+                k  = i * w + j
+                ni = nir[i, j]
+                rd = red[i, j]
+                re = red_edge[i, j]
+                sw = swir[i, j]
+
+                den  = ni + rd
+                ndvi = (ni - rd) / den if abs(den) > 1e-10 else 0.0
+                den  = ni + re
+                ndre = (ni - re) / den if abs(den) > 1e-10 else 0.0
+                msi  = sw / ni if abs(ni) > 1e-10 else 0.0
+
+                out[k, 0] = ndvi
+                out[k, 1] = ndre
+                out[k, 2] = msi
+                out[k, 4] = ni
+                out[k, 5] = sw
+                total    += ndvi
+                total_sq += ndvi * ndvi
+
+        mu    = total / n
+        var   = total_sq / n - mu * mu
+        sigma = np.sqrt(var) if var > 0.0 else 0.0
+        if sigma < 1e-9:
+            for k in prange(n):
+                out[k, 3] = 0.0
+        else:
+            for k in prange(n):
+                out[k, 3] = abs((out[k, 0] - mu) / sigma)
+
+
 # ---------------------------------------------------------------------------
 #  Feature stack builder
 # ---------------------------------------------------------------------------
@@ -80,23 +151,37 @@ def build_feature_stack(bands: dict):
     index_maps : dict
         Keys: 'ndvi', 'ndre', 'msi', 'zscore_ndvi'
     """
-    nir      = bands["nir"].astype(np.float32)
-    red      = bands["red"].astype(np.float32)
-    red_edge = bands["red_edge"].astype(np.float32)
-    swir     = bands["swir"].astype(np.float32)
-
-    ndvi        = compute_ndvi(nir, red)
-    ndre        = compute_ndre(nir, red_edge)
-    msi         = compute_msi(swir, nir)
-    zscore_ndvi = compute_zscore_anomaly(ndvi)
-
-    h, w = nir.shape
-
-    feature_array = np.stack(
-        [ndvi.ravel(), ndre.ravel(), msi.ravel(), zscore_ndvi.ravel(),
-         nir.ravel(), swir.ravel()],
-        axis=1,
-    ).astype(np.float32)
+    h, w = bands["nir"].shape
+    feature_array = np.empty((h * w, 6), dtype=np.float32)
+
+    if HAS_NUMBA:
+        _compute_features(
+            np.ascontiguousarray(bands["nir"],      dtype=np.float32),
+            np.ascontiguousarray(bands["red"],      dtype=np.float32),
+            np.ascontiguousarray(bands["red_edge"], dtype=np.float32),
+            np.ascontiguousarray(bands["swir"],     dtype=np.float32),
+            feature_array,
+        )
+        # Index maps are (H, W) views onto the feature columns -- no copies.
+        ndvi        = feature_array[:, 0].reshape(h, w)
+        ndre        = feature_array[:, 1].reshape(h, w)
+        msi         = feature_array[:, 2].reshape(h, w)
+        zscore_ndvi = feature_array[:, 3].reshape(h, w)
+    else:
+        nir      = np.asarray(bands["nir"], dtype=np.float32)
+        red      = np.asarray(bands["red"], dtype=np.float32)
+        red_edge = np.asarray(bands["red_edge"], dtype=np.float32)
+        swir     = np.asarray(bands["swir"], dtype=np.float32)
+
+        ndvi        = compute_ndvi(nir, red)
+        ndre        = compute_ndre(nir, red_edge)
+        msi         = compute_msi(swir, nir)
+        zscore_ndvi = compute_zscore_anomaly(ndvi)
+
+        # Fill the preallocated matrix column by column; ravel() of each
+        # contiguous map is a view, so this is the only (H*W, 6) buffer written.
+        for col, arr in enumerate((ndvi, ndre, msi, zscore_ndvi, nir, swir)):
+            feature_array[:, col] = arr.ravel()
 
     index_maps = {
         "ndvi":        ndvi,
@@ -3,7 +3,10 @@ train_model.py
 --------------
 Standalone training script: generates synthetic multispectral scenes,
 extracts spectral features, trains an XGBoost classifier (with RandomForest
-fallback), and saves artefacts for the inference service.
+fallback), and saves artefacts for the inference service.  The ensemble size
+is picked by a small grid search: the cheapest (n_estimators, max_depth)
+reaching BRIER_TARGET on a validation split wins and is refit on the full
+training split.
 
 Saved artefacts
 ---------------
@@ -29,7 +32,7 @@ import rasterio
 from rasterio.transform import from_bounds
 from scipy.ndimage import zoom
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, roc_auc_score
+from sklearn.metrics import brier_score_loss, classification_report, roc_auc_score
 from sklearn.model_selection import train_test_split
 
 try:
@@ -41,7 +44,7 @@ except ImportError:
 
 from spectral import build_feature_stack
 
-np.random.seed(42)
+rng = np.random.default_rng(42)
 
 # ---------------------------------------------------------------------------
 #  Crop spectral profiles  (mu, sigma) per band for each class
@@ -66,12 +69,23 @@ SCENE_H   = 256
 SCENE_W   = 256
 STRESS_FRACTION = 0.35   # ~35% of each scene is stressed
 
+# Model-size search space and the validation Brier score a candidate must
+# reach.  Brier (not F1) because the service reports mean probability and
+# buckets it at 0.3 / 0.6, so calibration matters, not just the 0.5 cut.
+GRID_MAX_DEPTH    = (6, 8, 10)
+GRID_N_ESTIMATORS = (30, 50, 75)
+BRIER_TARGET      = 0.01
+
+# XGBoost learning_rate * n_estimators of the original 300-round, 0.05 model;
+# smaller ensembles take proportionally larger steps to reach the same fit.
+XGB_SHRINKAGE_BUDGET = 300 * 0.05
+
 
 def perlin_noise(h: int, w: int, scale: float = 0.08) -> np.ndarray:
     """Generate smooth spatial noise via bicubic zoom of white noise."""
     low_h = max(2, int(h * scale))
     low_w = max(2, int(w * scale))
-    raw   = np.random.rand(low_h, low_w).astype(np.float32)
+    raw   = rng.random((low_h, low_w), dtype=np.float32)
     zoom_h = h / low_h
     zoom_w = w / low_w
     smooth = zoom(raw, (zoom_h, zoom_w), order=3)
@@ -93,9 +107,10 @@ def generate_scene(crop: str, stress_type: str, h: int = SCENE_H, w: int = SCENE
     sigma   = np.array(profile["sigma"], dtype=np.float32)
     shifts  = np.array(STRESS_SHIFTS[stress_type], dtype=np.float32)
 
-    # Base healthy reflectance
-    bands = np.random.normal(mu[:, None, None], sigma[:, None, None],
-                             size=(6, h, w)).astype(np.float32)
+    # Base healthy reflectance -- all 6 bands from one float32 draw
+    bands = rng.standard_normal((6, h, w), dtype=np.float32)
+    bands *= sigma[:, None, None]
+    bands += mu[:, None, None]
 
     # Stress mask via Perlin-like noise
     noise    = perlin_noise(h, w)
@@ -103,8 +118,7 @@ def generate_scene(crop: str, stress_type: str, h: int = SCENE_H, w: int = SCENE
     stress_mask = (noise >= threshold).astype(np.float32)
 
     # Apply stress spectral shift
-    for b in range(6):
-        bands[b] += stress_mask * shifts[b]
+    bands += shifts[:, None, None] * stress_mask
 
     bands = np.clip(bands, 0.01, 1.0)
     labels = stress_mask.astype(np.int32)
@@ -118,7 +132,9 @@ print(f"Generating {N_SCENES} synthetic scenes ({SCENE_H}x{SCENE_W})...")
 
 crops        = list(CROP_PROFILES.keys())
 stress_types = list(STRESS_SHIFTS.keys())
-all_features, all_labels = [], []
+n_pixels = SCENE_H * SCENE_W
+X = np.empty((N_SCENES * n_pixels, 6), dtype=np.float32)
+y = np.empty(N_SCENES * n_pixels, dtype=np.int32)
 first_scene_bands = None
 
 for i in range(N_SCENES):
@@ -138,45 +154,71 @@ for i in range(N_SCENES):
         "swir":     scene_bands[5],
     }
 
-    features, shape, _ = build_feature_stack(band_dict)
-    all_features.append(features)
-    all_labels.append(label_mask.ravel())
+    # Write each scene straight into its rows of the preallocated dataset
+    rows = slice(i * n_pixels, (i + 1) * n_pixels)
+    features, _, _ = build_feature_stack(band_dict)
+    X[rows] = features
+    y[rows] = label_mask.ravel()
     print(f"  Scene {i+1:02d}/{N_SCENES}  crop={crop:<10s}  stress={stress}")
 
-X = np.vstack(all_features).astype(np.float32)
-y = np.concatenate(all_labels).astype(np.int32)
 print(f"Dataset: {X.shape[0]:,} pixels  |  stressed: {y.sum():,}  |  healthy: {(y==0).sum():,}")
 
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.2, random_state=42, stratify=y
 )
+X_fit, X_val, y_fit, y_val = train_test_split(
+    X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
+)
 
 # ---------------------------------------------------------------------------
 #  Train
 # ---------------------------------------------------------------------------
-if HAS_XGB:
-    print("Training XGBClassifier (n_estimators=300)...")
-    clf = XGBClassifier(
-        n_estimators=300,
-        max_depth=6,
-        learning_rate=0.05,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        use_label_encoder=False,
-        eval_metric="logloss",
-        random_state=42,
-        n_jobs=-1,
-    )
-    clf.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=False)
-    model_name = "XGBClassifier"
-else:
-    print("Training RandomForestClassifier (n_estimators=300)...")
-    clf = RandomForestClassifier(
-        n_estimators=300, max_depth=12, class_weight="balanced",
+model_name = "XGBClassifier" if HAS_XGB else "RandomForestClassifier"
+
+
+def make_classifier(n_estimators: int, max_depth: int):
+    """Build an unfitted classifier of the available family."""
+    if HAS_XGB:
+        return XGBClassifier(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            learning_rate=XGB_SHRINKAGE_BUDGET / n_estimators,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            use_label_encoder=False,
+            eval_metric="logloss",
+            random_state=42,
+            n_jobs=-1,
+        )
+    return RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, class_weight="balanced",
         random_state=42, n_jobs=-1
     )
-    clf.fit(X_train, y_train)
-    model_name = "RandomForestClassifier"
+
+
+# Inference walks every tree for every pixel, so try the cheapest ensembles
+# (fewest node visits) first and keep the first one that meets BRIER_TARGET on
+# the validation split; otherwise keep the best-scoring candidate.
+candidates = sorted(
+    ((n, d) for n in GRID_N_ESTIMATORS for d in GRID_MAX_DEPTH),
+    key=lambda nd: nd[0] * nd[1],
+)
+best_brier, best_params = float("inf"), None
+for n_estimators, max_depth in candidates:
+    candidate = make_classifier(n_estimators, max_depth)
+    candidate.fit(X_fit, y_fit)
+    brier = float(brier_score_loss(y_val, candidate.predict_proba(X_val)[:, 1]))
+    print(f"  {model_name}  n_estimators={n_estimators:<3d} max_depth={max_depth:<2d}  Brier={brier:.5f}")
+    if brier < best_brier:
+        best_brier, best_params = brier, (n_estimators, max_depth)
+    if brier <= BRIER_TARGET:
+        break
+
+# Refit the selected size on the full training split before evaluation
+n_estimators, max_depth = best_params
+print(f"Refitting {model_name} (n_estimators={n_estimators}, max_depth={max_depth})...")
+clf = make_classifier(n_estimators, max_depth)
+clf.fit(X_train, y_train)
 
 y_pred  = clf.predict(X_test)
 y_proba = clf.predict_proba(X_test)[:, 1]
@@ -220,6 +262,8 @@ print(f"Saved: {dem_path}")
 metrics_path = os.path.join(_dir, "model_metrics.json")
 metrics = {
     "model":    model_name,
+    "n_estimators": n_estimators,
+    "max_depth":    max_depth,
     "accuracy": round(accuracy * 100, 2),
     "auc":      round(auc, 4),
     "n_scenes": N_SCENES,